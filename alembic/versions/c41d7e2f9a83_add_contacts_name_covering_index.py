@@ -0,0 +1,41 @@
+"""Add contacts name covering index
+
+Revision ID: c41d7e2f9a83
+Revises: 8b2e4d9a0c15
+Create Date: 2026-10-15 11:37:05.214479
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7e2f9a83'
+down_revision: Union[str, Sequence[str], None] = '8b2e4d9a0c15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'contacts_name_idx',
+            'contacts',
+            ['last_name', 'first_name', 'id'],
+            unique=False,
+            postgresql_include=['email', 'phone_number'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'contacts_name_idx',
+            table_name='contacts',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,34 @@
+"""Add last name prefix index
+
+Revision ID: e7a05b3c6d21
+Revises: c41d7e2f9a83
+Create Date: 2026-10-15 14:22:48.670392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a05b3c6d21'
+down_revision: Union[str, Sequence[str], None] = 'c41d7e2f9a83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # text_pattern_ops lets LIKE 'abc%' use the B-tree regardless of collation.
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS contacts_last_name_lower_prefix '
+            'ON contacts (lower(last_name) text_pattern_ops)'
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS contacts_last_name_lower_prefix')
@@ -0,0 +1,48 @@
+"""Add contacts updated_at
+
+Revision ID: f58c2a9e1b47
+Revises: e7a05b3c6d21
+Create Date: 2026-10-15 16:05:53.118924
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f58c2a9e1b47'
+down_revision: Union[str, Sequence[str], None] = 'e7a05b3c6d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'contacts',
+        sa.Column(
+            'updated_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+    )
+    # Bump updated_at on every write, including ones that bypass SQLAlchemy.
+    op.execute(
+        'CREATE OR REPLACE FUNCTION contacts_set_updated_at() RETURNS trigger AS $$ '
+        'BEGIN NEW.updated_at = now(); RETURN NEW; END; '
+        '$$ LANGUAGE plpgsql'
+    )
+    op.execute(
+        'CREATE TRIGGER contacts_set_updated_at BEFORE UPDATE ON contacts '
+        'FOR EACH ROW EXECUTE FUNCTION contacts_set_updated_at()'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER IF EXISTS contacts_set_updated_at ON contacts')
+    op.execute('DROP FUNCTION IF EXISTS contacts_set_updated_at()')
+    op.drop_column('contacts', 'updated_at')
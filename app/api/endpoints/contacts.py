@@ -1,74 +1,253 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.ext.asyncio import AsyncSession
+import hashlib
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import String, bindparam, delete, func, insert, lambda_stmt, literal_column, update
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
 from sqlalchemy.future import select
 from typing import List, Optional
 
-from app.core.database import get_db
+from app.core.cache import (
+    IDEMPOTENCY_MISMATCH,
+    IDEMPOTENCY_RELEASED,
+    cached,
+    claim_idempotency_key,
+    etag_matches,
+    invalidate_contacts,
+    release_idempotency_key,
+    store_idempotent_response,
+    wait_for_idempotent_response,
+)
+from app.core.database import get_db, with_relations
 from app.models.contact import Contact
-from app.schemas.contact import ContactCreate, ContactUpdate, ContactResponse
+from app.schemas.contact import (
+    CONTACT_ADAPTER,
+    CONTACT_LIST_ADAPTER,
+    ContactCreate,
+    ContactUpdate,
+    ContactResponse,
+)
 
 router = APIRouter()
 
+# Matches the contacts_search_trgm expression index. The separators are
+# rendered as SQL literals rather than bound parameters so the planner can
+# match the expression against the index.
+_SEARCH_TEXT = (
+    func.coalesce(Contact.first_name, literal_column("''"))
+    + literal_column("' '")
+    + func.coalesce(Contact.last_name, literal_column("''"))
+    + literal_column("' '")
+    + func.coalesce(Contact.email, literal_column("''"))
+)
+
+# Columns serialized by ContactResponse; the list select and the
+# INSERT/DELETE ... RETURNING clauses use these instead of full ORM instances.
+_CONTACT_COLUMNS = (
+    Contact.id,
+    Contact.first_name,
+    Contact.last_name,
+    Contact.email,
+    Contact.phone_number,
+    Contact.address,
+)
+
+# Built once; the pattern is supplied at execution time as the "q" parameter.
+_SEARCH_CLAUSE = _SEARCH_TEXT.ilike(bindparam("q", type_=String), escape="\\")
+
+# Matches the contacts_last_name_lower_prefix B-tree index. Both sides are
+# lowercased by PostgreSQL so non-ASCII case folding agrees; lower() of the
+# parameter is folded to a constant, keeping the index usable.
+_PREFIX_CLAUSE = func.lower(Contact.last_name).like(
+    func.lower(bindparam("prefix", type_=String)), escape="\\"
+)
+
+# Lambda statements are compiled once and cached by SQLAlchemy; values
+# closed over by the per-request lambdas become bound parameters.
+_LIST_SELECT = lambda_stmt(lambda: select(*_CONTACT_COLUMNS))
+_CONTACT_SELECT = lambda_stmt(lambda: with_relations(select(Contact), Contact))
+_UPDATED_AT_SELECT = lambda_stmt(lambda: select(Contact.updated_at))
+
+# Escapes LIKE metacharacters, including the escape character itself, so
+# search terms always match literally.
+_LIKE_ESCAPE = str.maketrans({"%": r"\%", "_": r"\_", "\\": r"\\"})
+
+# Pages larger than this are streamed from a server-side cursor in batches
+# of this size instead of being built in memory.
+_STREAM_BATCH_SIZE = 200
+
+def _contact_etag(contact_id: int, updated_at) -> str:
+    return f'W/"{contact_id}-{int(updated_at.timestamp() * 1_000_000)}"'
+
+async def _stream_contacts(result: AsyncResult):
+    try:
+        yield b"["
+        separator = b""
+        async for rows in result.partitions(_STREAM_BATCH_SIZE):
+            contacts = CONTACT_LIST_ADAPTER.validate_python(rows, from_attributes=True)
+            # Strip the surrounding brackets to splice batches into one array.
+            yield separator + CONTACT_LIST_ADAPTER.dump_json(contacts)[1:-1]
+            separator = b","
+        yield b"]"
+    finally:
+        await result.close()
+
 @router.post("/", response_model=ContactResponse)
-async def create_contact(contact: ContactCreate, db: AsyncSession = Depends(get_db)):
-    new_contact = Contact(**contact.model_dump())
-    db.add(new_contact)
-    await db.commit()
-    await db.refresh(new_contact)
-    return new_contact
+async def create_contact(
+    contact: ContactCreate,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    fingerprint = None
+    if idempotency_key is not None:
+        # Replays must carry the same body as the request that claimed the key.
+        fingerprint = hashlib.sha256(contact.model_dump_json().encode()).hexdigest()
+    while idempotency_key is not None and not await claim_idempotency_key(
+        idempotency_key, fingerprint
+    ):
+        body = await wait_for_idempotent_response(idempotency_key, fingerprint)
+        if body is IDEMPOTENCY_MISMATCH:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used with a different request body",
+            )
+        if body is IDEMPOTENCY_RELEASED:
+            # The request holding the key failed; try to take it over.
+            continue
+        if body is None:
+            raise HTTPException(
+                status_code=409, detail="A request with this Idempotency-Key is in progress"
+            )
+        return Response(content=body, media_type="application/json")
+
+    try:
+        query = insert(Contact).values(**contact.model_dump()).returning(*_CONTACT_COLUMNS)
+        result = await db.execute(query)
+        new_contact = result.one()
+        await db.commit()
+    except Exception:
+        if idempotency_key is not None:
+            await release_idempotency_key(idempotency_key)
+        raise
+    await invalidate_contacts()
 
-@router.get("/", response_model=List[ContactResponse])
+    body = CONTACT_ADAPTER.dump_json(CONTACT_ADAPTER.validate_python(new_contact))
+    if idempotency_key is not None:
+        await store_idempotent_response(idempotency_key, fingerprint, body)
+    return Response(content=body, media_type="application/json")
+
+@router.get("/", response_model=None, responses={200: {"model": List[ContactResponse]}})
+@cached(
+    # Streamed pages are never stored, so skip the Redis lookup for them
+    lambda skip, limit, search, after_id, prefix, **_: (
+        f"list:{skip}:{limit}:{after_id}:{int(prefix)}:{search}"
+        if limit <= _STREAM_BATCH_SIZE
+        else None
+    )
+)
 async def read_contacts(
-    skip: int = 0,
+    skip: int = Query(0, description="Legacy offset pagination; prefer after_id."),
     limit: int = 100,
     search: Optional[str] = None,
+    prefix: bool = Query(
+        False, description="Match search as a prefix of last_name instead of anywhere in the contact."
+    ),
+    after_id: Optional[int] = Query(
+        None,
+        description=(
+            "Keyset pagination: return contacts with an id greater than this, ordered "
+            "by id. Start with after_id=0 and pass the last id of each page; ids from "
+            "the default name-ordered listing are not valid cursors."
+        ),
+    ),
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(Contact)
-    if search:
-        query = query.where(
-            (Contact.first_name.ilike(f"%{search}%")) |
-            (Contact.last_name.ilike(f"%{search}%")) |
-            (Contact.email.ilike(f"%{search}%"))
-        )
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    contacts = result.scalars().all()
-    return contacts
+    query = _LIST_SELECT
+    params = {}
+    search = search.strip() if search else None
+    if search and prefix:
+        # B-tree range scan; cheaper than the trigram index for typeahead.
+        query += lambda s: s.where(_PREFIX_CLAUSE)
+        params["prefix"] = f"{search.translate(_LIKE_ESCAPE)}%"
+    elif search:
+        query += lambda s: s.where(_SEARCH_CLAUSE)
+        params["q"] = f"%{search.translate(_LIKE_ESCAPE)}%"
+    if after_id is not None:
+        # Keyset pagination walks the primary key index instead of scanning
+        # and discarding `skip` rows.
+        query += lambda s: s.where(Contact.id > after_id).order_by(Contact.id)
+    else:
+        # id breaks ties between equal names so offset pages are stable.
+        query += lambda s: s.order_by(Contact.last_name, Contact.first_name, Contact.id).offset(skip)
+    query += lambda s: s.limit(limit)
+    if limit > _STREAM_BATCH_SIZE:
+        result = await db.stream(query, params)
+        return StreamingResponse(_stream_contacts(result), media_type="application/json")
+    result = await db.execute(query, params)
+    contacts = CONTACT_LIST_ADAPTER.validate_python(result.all(), from_attributes=True)
+    return Response(
+        content=CONTACT_LIST_ADAPTER.dump_json(contacts),
+        media_type="application/json",
+    )
 
 @router.get("/{contact_id}", response_model=ContactResponse)
-async def read_contact(contact_id: int, db: AsyncSession = Depends(get_db)):
-    query = select(Contact).where(Contact.id == contact_id)
+@cached(lambda contact_id, **_: str(contact_id))
+async def read_contact(
+    contact_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    if if_none_match is not None:
+        # Probe only the version column so unchanged contacts skip the full
+        # fetch and encoding.
+        query = _UPDATED_AT_SELECT + (lambda s: s.where(Contact.id == contact_id))
+        result = await db.execute(query)
+        updated_at = result.scalar_one_or_none()
+        if updated_at is not None:
+            etag = _contact_etag(contact_id, updated_at)
+            if etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers={"ETag": etag})
+
+    query = _CONTACT_SELECT + (lambda s: s.where(Contact.id == contact_id))
     result = await db.execute(query)
     contact = result.scalar_one_or_none()
     if contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
-    return contact
+    return Response(
+        content=CONTACT_ADAPTER.dump_json(CONTACT_ADAPTER.validate_python(contact)),
+        media_type="application/json",
+        headers={"ETag": _contact_etag(contact.id, contact.updated_at)},
+    )
 
 @router.put("/{contact_id}", response_model=ContactResponse)
 async def update_contact(contact_id: int, contact_update: ContactUpdate, db: AsyncSession = Depends(get_db)):
-    query = select(Contact).where(Contact.id == contact_id)
+    query = (
+        update(Contact)
+        .where(Contact.id == contact_id)
+        .values(**contact_update.model_dump(exclude_unset=True))
+        .returning(Contact)
+    )
     result = await db.execute(query)
     contact = result.scalar_one_or_none()
     if contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
     
-    update_data = contact_update.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(contact, key, value)
-    
     await db.commit()
-    await db.refresh(contact)
+    await invalidate_contacts()
     return contact
 
 @router.delete("/{contact_id}", response_model=ContactResponse)
 async def delete_contact(contact_id: int, db: AsyncSession = Depends(get_db)):
-    query = select(Contact).where(Contact.id == contact_id)
+    query = (
+        delete(Contact)
+        .where(Contact.id == contact_id)
+        .returning(*_CONTACT_COLUMNS)
+    )
     result = await db.execute(query)
-    contact = result.scalar_one_or_none()
+    contact = result.one_or_none()
     if contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
     
-    await db.delete(contact)
     await db.commit()
+    await invalidate_contacts()
     return contact
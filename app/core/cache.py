@@ -0,0 +1,193 @@
+import asyncio
+import functools
+from typing import Callable, Optional
+
+import redis.asyncio as redis
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+
+CACHE_TTL_SECONDS = 5
+
+IDEMPOTENCY_TTL_SECONDS = 60
+IDEMPOTENCY_WAIT_SECONDS = 5
+_IDEMPOTENCY_PENDING = b"pending"
+
+# Returned by wait_for_idempotent_response when the claim disappeared because
+# the request holding it failed; the caller should claim the key itself.
+IDEMPOTENCY_RELEASED = object()
+# Returned by wait_for_idempotent_response when the key was claimed for a
+# request with a different body.
+IDEMPOTENCY_MISMATCH = object()
+
+# Bumped on every write so stale entries are orphaned (and left to expire)
+# instead of being deleted with a KEYS/SCAN over the keyspace.
+_VERSION_KEY = "contacts:version"
+
+# Short timeouts so an unreachable Redis degrades to a cache miss instead of
+# stalling requests on the OS TCP timeout.
+redis_client: Optional[redis.Redis] = (
+    redis.from_url(settings.REDIS_URL, socket_connect_timeout=0.1, socket_timeout=0.1)
+    if settings.REDIS_URL
+    else None
+)
+
+
+async def _versioned_key(key: str) -> str:
+    version = await redis_client.get(_VERSION_KEY)
+    return f"contacts:v{int(version or 0)}:{key}"
+
+
+async def invalidate_contacts() -> None:
+    if redis_client is None:
+        return
+    try:
+        await redis_client.incr(_VERSION_KEY)
+    except redis.RedisError:
+        pass
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of ``etag`` against an If-None-Match header value."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+async def _store(key: str, body: bytes, etag: Optional[str]) -> None:
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(key, body, ex=CACHE_TTL_SECONDS)
+            if etag is not None:
+                pipe.set(f"{key}:etag", etag, ex=CACHE_TTL_SECONDS)
+            await pipe.execute()
+    except redis.RedisError:
+        pass
+
+
+def cached(key_builder: Callable[..., Optional[str]]):
+    """Cache a GET endpoint's JSON body in Redis for CACHE_TTL_SECONDS.
+
+    ``key_builder`` receives the endpoint's keyword arguments and may return
+    None to bypass the cache, e.g. for calls that will stream. Endpoints
+    return a ready-made Response with the serialized body. StreamingResponses
+    are passed through uncached. Only 200 responses are cached, together with
+    their ETag header; a cache hit answers a matching ``if_none_match``
+    argument with 304. Caching is a no-op when REDIS_URL is not configured or
+    Redis is unreachable.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = key_builder(**kwargs)
+            if redis_client is None or key is None:
+                return await func(*args, **kwargs)
+
+            try:
+                key = await _versioned_key(key)
+                body, etag = await redis_client.mget(key, f"{key}:etag")
+            except redis.RedisError:
+                return await func(*args, **kwargs)
+            if body is not None:
+                headers = None
+                if etag is not None:
+                    etag = etag.decode()
+                    headers = {"ETag": etag}
+                    if etag_matches(kwargs.get("if_none_match"), etag):
+                        return Response(status_code=304, headers=headers)
+                return Response(content=body, media_type="application/json", headers=headers)
+
+            result = await func(*args, **kwargs)
+            if isinstance(result, StreamingResponse):
+                # Buffering the stream to cache it would defeat streaming.
+                return result
+            if result.status_code == 200:
+                await _store(key, result.body, result.headers.get("etag"))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _idempotency_key(key: str) -> str:
+    return f"idempotency:contacts:{key}"
+
+
+def _idempotency_value(fingerprint: str, payload: bytes) -> bytes:
+    # The request fingerprint is stored with both the claim and the response.
+    return fingerprint.encode() + b":" + payload
+
+
+async def claim_idempotency_key(key: str, fingerprint: str) -> bool:
+    """Reserve ``key`` for the current request, identified by ``fingerprint``.
+
+    Returns False when another request already holds it. Without Redis every
+    request is allowed through.
+    """
+    if redis_client is None:
+        return True
+    try:
+        claimed = await redis_client.set(
+            _idempotency_key(key),
+            _idempotency_value(fingerprint, _IDEMPOTENCY_PENDING),
+            nx=True,
+            ex=IDEMPOTENCY_TTL_SECONDS,
+        )
+    except redis.RedisError:
+        return True
+    return bool(claimed)
+
+
+async def wait_for_idempotent_response(key: str, fingerprint: str):
+    """Poll for the response stored by the request holding ``key``.
+
+    Returns the stored body, IDEMPOTENCY_MISMATCH if the key belongs to a
+    request with a different ``fingerprint``, IDEMPOTENCY_RELEASED if the
+    claim has gone away, or None if it is still pending after
+    IDEMPOTENCY_WAIT_SECONDS.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + IDEMPOTENCY_WAIT_SECONDS
+    while loop.time() < deadline:
+        try:
+            value = await redis_client.get(_idempotency_key(key))
+        except redis.RedisError:
+            return None
+        if value is None:
+            return IDEMPOTENCY_RELEASED
+        stored_fingerprint, _, body = value.partition(b":")
+        if stored_fingerprint != fingerprint.encode():
+            return IDEMPOTENCY_MISMATCH
+        if body != _IDEMPOTENCY_PENDING:
+            return body
+        await asyncio.sleep(0.1)
+    return None
+
+
+async def store_idempotent_response(key: str, fingerprint: str, body: bytes) -> None:
+    if redis_client is None:
+        return
+    try:
+        await redis_client.set(
+            _idempotency_key(key),
+            _idempotency_value(fingerprint, body),
+            ex=IDEMPOTENCY_TTL_SECONDS,
+        )
+    except redis.RedisError:
+        # A claim left pending would make every retry wait and then get a 409.
+        await release_idempotency_key(key)
+
+
+async def release_idempotency_key(key: str) -> None:
+    """Drop a claim whose request failed so the client can retry."""
+    if redis_client is None:
+        return
+    try:
+        await redis_client.delete(_idempotency_key(key))
+    except redis.RedisError:
+        pass
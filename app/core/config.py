@@ -1,7 +1,11 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # Response caching is disabled when unset
+    REDIS_URL: Optional[str] = None
     
     class Config:
         env_file = ".env"
@@ -1,8 +1,22 @@
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import sessionmaker, declarative_base, selectinload
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+# One engine per process; sessions borrow pooled connections from it.
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=True,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=10,
+    max_overflow=20,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    # SQLAlchemy's prepared statement cache and asyncpg's own statement cache,
+    # both per connection.
+    connect_args={"prepared_statement_cache_size": 500, "statement_cache_size": 500},
+)
 
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
@@ -13,3 +27,9 @@ Base = declarative_base()
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+def with_relations(stmt, model):
+    """Eager-load every relationship on ``model`` with selectinload to avoid N+1 queries."""
+    return stmt.options(
+        *[selectinload(getattr(model, rel.key)) for rel in inspect(model).relationships]
+    )
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, EmailStr, TypeAdapter
+from typing import List, Optional
 
 class ContactBase(BaseModel):
     first_name: str
@@ -17,5 +17,9 @@ class ContactUpdate(ContactBase):
 class ContactResponse(ContactBase):
     id: int
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, defer_build=False)
+
+# Built once at import so endpoints validate and serialize whole payloads
+# in pydantic-core rather than model by model.
+CONTACT_ADAPTER = TypeAdapter(ContactResponse)
+CONTACT_LIST_ADAPTER = TypeAdapter(List[ContactResponse])
@@ -1,12 +1,21 @@
+import asyncio
+import hashlib
+
 import pytest
+import redis.asyncio as redis
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from app.main import app
+from app.core import cache
 from app.core.database import Base, get_db
 from app.core.config import settings
+from app.models.contact import Contact
+from app.schemas.contact import ContactCreate
 
 # Use a separate test database if possible, or just the same one for now
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL.replace("contact_db", "contact_db_test")
@@ -17,28 +26,40 @@ SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL.replace("contact_db", "contact_d
 # Let's stick to the existing DB but truncate tables or use transaction rollback.
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-@pytest_asyncio.fixture(scope="function")
-async def db_session():
-    # Create engine per test to avoid loop issues
-    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
-    
-    # Create tables
+@pytest_asyncio.fixture(scope="session")
+async def engine():
+    # NullPool keeps connections from outliving the event loop they were
+    # opened on
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False, poolclass=NullPool)
+
+    # Create the schema once for the whole run
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
-    
-    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-    
-    async with async_session() as session:
-        yield session
-        # Cleanup could go here (e.g. truncate tables)
-        
-    # Drop tables to clean up
+
+    yield engine
+
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
-    
+
     await engine.dispose()
 
+@pytest_asyncio.fixture(scope="function")
+async def db_session(engine):
+    # Each test runs inside an outer transaction that is rolled back at
+    # teardown; commits made by the endpoints only release savepoints.
+    conn = await engine.connect()
+    trans = await conn.begin()
+    session = AsyncSession(
+        bind=conn, expire_on_commit=False, join_transaction_mode="create_savepoint"
+    )
+
+    yield session
+
+    await session.close()
+    await trans.rollback()
+    await conn.close()
+
 @pytest_asyncio.fixture(scope="function")
 async def client(db_session):
     async def override_get_db():
@@ -51,6 +72,14 @@ async def client(db_session):
     
     app.dependency_overrides.clear()
 
+@pytest.fixture(scope="function")
+def fake_redis(monkeypatch):
+    # Enables the Redis-backed cache and idempotency paths for one test
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+    monkeypatch.setattr(cache, "redis_client", client)
+    return client
+
 @pytest.mark.asyncio
 async def test_create_contact(client):
     response = await client.post(
@@ -168,3 +197,461 @@ async def test_delete_contact(client):
     # Verify deletion
     response = await client.get(f"/contacts/{contact_id}")
     assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_search_contacts_escapes_wildcards(client):
+    await client.post(
+        "/contacts/",
+        json={
+            "first_name": "Wild",
+            "last_name": "Card",
+            "email": "wildcard@example.com",
+            "phone_number": "5555555555"
+        },
+    )
+
+    response = await client.get("/contacts/?search=%25")
+    assert response.status_code == 200
+    assert response.json() == []
+
+    response = await client.get("/contacts/?search=_")
+    assert response.status_code == 200
+    assert response.json() == []
+
+@pytest.mark.asyncio
+async def test_read_contacts_after_id(client):
+    ids = []
+    for i in range(3):
+        create_response = await client.post(
+            "/contacts/",
+            json={
+                "first_name": f"Page{i}",
+                "last_name": "Keyset",
+                "email": f"page{i}@example.com",
+                "phone_number": "6666666666"
+            },
+        )
+        ids.append(create_response.json()["id"])
+
+    response = await client.get(f"/contacts/?after_id={ids[0]}&limit=1")
+    assert response.status_code == 200
+    data = response.json()
+    assert [contact["id"] for contact in data] == [ids[1]]
+
+    response = await client.get(f"/contacts/?after_id={ids[1]}")
+    assert [contact["id"] for contact in response.json()] == [ids[2]]
+
+@pytest.mark.asyncio
+async def test_update_missing_contact(client):
+    response = await client.put(
+        "/contacts/999999",
+        json={
+            "first_name": "No",
+            "last_name": "One",
+            "email": "noone@example.com",
+            "phone_number": "7777777777"
+        },
+    )
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_delete_missing_contact(client):
+    response = await client.delete("/contacts/999999")
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_read_contacts_ordered_by_name(client):
+    for first_name, last_name in [("Zed", "Brown"), ("Amy", "Brown"), ("Bob", "Adams")]:
+        await client.post(
+            "/contacts/",
+            json={
+                "first_name": first_name,
+                "last_name": last_name,
+                "email": f"{first_name.lower()}@example.com",
+                "phone_number": "8888888888"
+            },
+        )
+
+    response = await client.get("/contacts/")
+    assert response.status_code == 200
+    names = [(contact["last_name"], contact["first_name"]) for contact in response.json()]
+    assert names == [("Adams", "Bob"), ("Brown", "Amy"), ("Brown", "Zed")]
+
+@pytest.mark.asyncio
+async def test_read_contacts_streamed(client):
+    for i in range(3):
+        await client.post(
+            "/contacts/",
+            json={
+                "first_name": f"Stream{i}",
+                "last_name": "Large",
+                "email": f"stream{i}@example.com",
+                "phone_number": "9999999999"
+            },
+        )
+
+    response = await client.get("/contacts/?limit=1000")
+    assert response.status_code == 200
+    data = response.json()
+    assert [contact["first_name"] for contact in data] == ["Stream0", "Stream1", "Stream2"]
+
+@pytest.mark.asyncio
+async def test_search_contacts_strips_whitespace(client):
+    await client.post(
+        "/contacts/",
+        json={
+            "first_name": "Padded",
+            "last_name": "Search",
+            "email": "padded@example.com",
+            "phone_number": "1212121212"
+        },
+    )
+
+    response = await client.get("/contacts/?search=%20%20Padded%20")
+    assert response.status_code == 200
+    data = response.json()
+    assert [contact["first_name"] for contact in data] == ["Padded"]
+
+@pytest.mark.asyncio
+async def test_search_contacts_by_last_name_prefix(client):
+    for first_name, last_name in [("Jo", "Johnson"), ("Ann", "Jones"), ("Johnny", "Smith")]:
+        await client.post(
+            "/contacts/",
+            json={
+                "first_name": first_name,
+                "last_name": last_name,
+                "email": f"{first_name.lower()}.prefix@example.com",
+                "phone_number": "1313131313"
+            },
+        )
+
+    response = await client.get("/contacts/?search=jo&prefix=true")
+    assert response.status_code == 200
+    data = response.json()
+    assert [contact["last_name"] for contact in data] == ["Johnson", "Jones"]
+
+@pytest.mark.asyncio
+async def test_read_contact_etag(client):
+    create_response = await client.post(
+        "/contacts/",
+        json={
+            "first_name": "Cached",
+            "last_name": "Contact",
+            "email": "etag@example.com",
+            "phone_number": "1414141414"
+        },
+    )
+    contact_id = create_response.json()["id"]
+
+    response = await client.get(f"/contacts/{contact_id}")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = await client.get(f"/contacts/{contact_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+    response = await client.get(f"/contacts/{contact_id}", headers={"If-None-Match": 'W/"stale"'})
+    assert response.status_code == 200
+    assert response.json()["id"] == contact_id
+
+@pytest.mark.asyncio
+async def test_create_contact_long_address(client):
+    # Incompressible, so it can't be squeezed into an index tuple
+    address = "".join(hashlib.sha256(str(i).encode()).hexdigest() for i in range(128))
+    response = await client.post(
+        "/contacts/",
+        json={
+            "first_name": "Long",
+            "last_name": "Address",
+            "email": "long.address@example.com",
+            "phone_number": "1515151515",
+            "address": address
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["address"] == address
+
+async def _create_cached_contact(client, email):
+    response = await client.post(
+        "/contacts/",
+        json={
+            "first_name": "Cache",
+            "last_name": "Hit",
+            "email": email,
+            "phone_number": "1616161616"
+        },
+    )
+    return response.json()
+
+@pytest.mark.asyncio
+async def test_read_contact_served_from_cache(client, db_session, fake_redis):
+    contact = await _create_cached_contact(client, "cache.hit@example.com")
+
+    response = await client.get(f"/contacts/{contact['id']}")
+    assert response.json()["first_name"] == "Cache"
+
+    # Change the row behind the API's back; the cached body is still served.
+    await db_session.execute(
+        update(Contact).where(Contact.id == contact["id"]).values(first_name="Changed")
+    )
+    response = await client.get(f"/contacts/{contact['id']}")
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "Cache"
+
+@pytest.mark.asyncio
+async def test_streamed_list_skips_cache(client, fake_redis, monkeypatch):
+    await _create_cached_contact(client, "cache.stream@example.com")
+
+    async def mget_unexpected(*args, **kwargs):
+        raise AssertionError("streamed lists should not hit the cache")
+
+    monkeypatch.setattr(fake_redis, "mget", mget_unexpected)
+    response = await client.get("/contacts/?limit=1000")
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+@pytest.mark.asyncio
+async def test_cache_invalidated_by_update(client, fake_redis):
+    contact = await _create_cached_contact(client, "cache.update@example.com")
+    await client.get(f"/contacts/{contact['id']}")
+
+    await client.put(
+        f"/contacts/{contact['id']}",
+        json={
+            "first_name": "Fresh",
+            "last_name": "Hit",
+            "email": "cache.update@example.com",
+            "phone_number": "1616161616"
+        },
+    )
+    response = await client.get(f"/contacts/{contact['id']}")
+    assert response.json()["first_name"] == "Fresh"
+
+@pytest.mark.asyncio
+async def test_cache_invalidated_by_delete(client, fake_redis):
+    contact = await _create_cached_contact(client, "cache.delete@example.com")
+    await client.get(f"/contacts/{contact['id']}")
+
+    await client.delete(f"/contacts/{contact['id']}")
+    response = await client.get(f"/contacts/{contact['id']}")
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_cache_invalidated_by_create(client, fake_redis):
+    await _create_cached_contact(client, "cache.first@example.com")
+    response = await client.get("/contacts/")
+    assert len(response.json()) == 1
+
+    await _create_cached_contact(client, "cache.second@example.com")
+    response = await client.get("/contacts/")
+    assert len(response.json()) == 2
+
+@pytest.mark.asyncio
+async def test_read_contact_304_from_cache(client, db_session, fake_redis):
+    contact = await _create_cached_contact(client, "cache.etag@example.com")
+    response = await client.get(f"/contacts/{contact['id']}")
+    etag = response.headers["etag"]
+
+    # With the row gone from the database, only the cache can answer.
+    await db_session.execute(delete(Contact).where(Contact.id == contact["id"]))
+    response = await client.get(f"/contacts/{contact['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+IDEMPOTENT_CONTACT = {
+    "first_name": "Once",
+    "last_name": "Only",
+    "email": "once@example.com",
+    "phone_number": "1717171717"
+}
+IDEMPOTENT_FINGERPRINT = hashlib.sha256(
+    ContactCreate(**IDEMPOTENT_CONTACT).model_dump_json().encode()
+).hexdigest().encode()
+
+@pytest.mark.asyncio
+async def test_create_contact_idempotent_replay(client, db_session, fake_redis):
+    headers = {"Idempotency-Key": "replay"}
+    first = await client.post("/contacts/", json=IDEMPOTENT_CONTACT, headers=headers)
+    second = await client.post("/contacts/", json=IDEMPOTENT_CONTACT, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    count = await db_session.scalar(select(func.count()).select_from(Contact))
+    assert count == 1
+
+@pytest.mark.asyncio
+async def test_create_contact_idempotency_key_reused_with_different_body(
+    client, db_session, fake_redis
+):
+    headers = {"Idempotency-Key": "reused"}
+    first = await client.post("/contacts/", json=IDEMPOTENT_CONTACT, headers=headers)
+    second = await client.post(
+        "/contacts/", json={**IDEMPOTENT_CONTACT, "first_name": "Twice"}, headers=headers
+    )
+
+    assert first.status_code == 200
+    assert second.status_code == 422
+    count = await db_session.scalar(select(func.count()).select_from(Contact))
+    assert count == 1
+
+@pytest.mark.asyncio
+async def test_create_contact_idempotency_key_pending(client, fake_redis, monkeypatch):
+    monkeypatch.setattr(cache, "IDEMPOTENCY_WAIT_SECONDS", 0.2)
+    await fake_redis.set("idempotency:contacts:pending", IDEMPOTENT_FINGERPRINT + b":pending")
+
+    response = await client.post(
+        "/contacts/", json=IDEMPOTENT_CONTACT, headers={"Idempotency-Key": "pending"}
+    )
+    assert response.status_code == 409
+
+@pytest.mark.asyncio
+async def test_create_contact_takes_over_released_idempotency_key(client, db_session, fake_redis):
+    await fake_redis.set("idempotency:contacts:released", IDEMPOTENT_FINGERPRINT + b":pending")
+
+    request = asyncio.create_task(
+        client.post("/contacts/", json=IDEMPOTENT_CONTACT, headers={"Idempotency-Key": "released"})
+    )
+    await asyncio.sleep(0.2)
+    # The first attempt failed and dropped its claim while this one was polling
+    await fake_redis.delete("idempotency:contacts:released")
+    response = await request
+
+    assert response.status_code == 200
+    assert response.json()["email"] == IDEMPOTENT_CONTACT["email"]
+    count = await db_session.scalar(select(func.count()).select_from(Contact))
+    assert count == 1
+    stored = await fake_redis.get("idempotency:contacts:released")
+    assert stored == IDEMPOTENT_FINGERPRINT + b":" + response.content
+
+@pytest.mark.asyncio
+async def test_create_contact_failure_releases_idempotency_key(client, fake_redis):
+    await client.post("/contacts/", json=IDEMPOTENT_CONTACT)
+
+    # Duplicate email
+    with pytest.raises(IntegrityError):
+        await client.post(
+            "/contacts/", json=IDEMPOTENT_CONTACT, headers={"Idempotency-Key": "failed"}
+        )
+    assert await fake_redis.get("idempotency:contacts:failed") is None
+
+@pytest.mark.asyncio
+async def test_create_contact_store_failure_releases_idempotency_key(client, fake_redis, monkeypatch):
+    set_ = fake_redis.set
+
+    async def set_failing_on_response(name, value, **kwargs):
+        if name.startswith("idempotency:") and not value.endswith(b":pending"):
+            raise redis.RedisError("write failed")
+        return await set_(name, value, **kwargs)
+
+    monkeypatch.setattr(fake_redis, "set", set_failing_on_response)
+
+    response = await client.post(
+        "/contacts/", json=IDEMPOTENT_CONTACT, headers={"Idempotency-Key": "unstored"}
+    )
+    assert response.status_code == 200
+    assert await fake_redis.get("idempotency:contacts:unstored") is None
+
+@pytest.mark.asyncio
+async def test_cors_allows_conditional_requests(client):
+    response = await client.options(
+        "/contacts/1",
+        headers={
+            "Origin": "http://localhost:5173",
+            "Access-Control-Request-Method": "GET",
+            "Access-Control-Request-Headers": "If-None-Match",
+        },
+    )
+    assert response.status_code == 200
+
+    response = await client.get("/contacts/999999", headers={"Origin": "http://localhost:5173"})
+    assert "etag" in response.headers["access-control-expose-headers"].lower()
+
+@pytest.mark.asyncio
+async def test_read_contacts_keyset_from_zero(client):
+    ids = []
+    # Created in reverse name order so id order and name order disagree
+    for last_name in ["Carter", "Baker", "Adams"]:
+        create_response = await client.post(
+            "/contacts/",
+            json={
+                "first_name": "Walk",
+                "last_name": last_name,
+                "email": f"walk.{last_name.lower()}@example.com",
+                "phone_number": "1818181818"
+            },
+        )
+        ids.append(create_response.json()["id"])
+
+    seen = []
+    after_id = 0
+    while True:
+        response = await client.get(f"/contacts/?after_id={after_id}&limit=2")
+        page = [contact["id"] for contact in response.json()]
+        if not page:
+            break
+        seen.extend(page)
+        after_id = page[-1]
+    assert seen == ids
+
+@pytest.mark.asyncio
+async def test_search_contacts_escapes_backslash(client):
+    await client.post(
+        "/contacts/",
+        json={
+            "first_name": "Dirk\\son",
+            "last_name": "Slash",
+            "email": "dirk.son@example.com",
+            "phone_number": "1919191919"
+        },
+    )
+
+    response = await client.get("/contacts/", params={"search": "k\\s"})
+    assert response.status_code == 200
+    assert [contact["first_name"] for contact in response.json()] == ["Dirk\\son"]
+
+    response = await client.get("/contacts/", params={"search": "ks"})
+    assert response.status_code == 200
+    assert response.json() == []
+
+@pytest.mark.asyncio
+async def test_search_contacts_by_last_name_prefix_non_ascii(client):
+    await client.post(
+        "/contacts/",
+        json={
+            "first_name": "Deniz",
+            "last_name": "İnce",
+            "email": "deniz@example.com",
+            "phone_number": "2020202020"
+        },
+    )
+
+    response = await client.get("/contacts/", params={"search": "İn", "prefix": "true"})
+    assert response.status_code == 200
+    assert [contact["last_name"] for contact in response.json()] == ["İnce"]
+
+@pytest.mark.asyncio
+async def test_updated_at_bumped_by_raw_sql(client, db_session):
+    create_response = await client.post(
+        "/contacts/",
+        json={
+            "first_name": "Raw",
+            "last_name": "Write",
+            "email": "raw.write@example.com",
+            "phone_number": "2121212121"
+        },
+    )
+    contact_id = create_response.json()["id"]
+
+    # A write outside SQLAlchemy's onupdate; the trigger must override the value
+    await db_session.execute(
+        text(
+            "UPDATE contacts SET first_name = 'Changed', updated_at = '2000-01-01T00:00:00Z' "
+            "WHERE id = :id"
+        ),
+        {"id": contact_id},
+    )
+    updated_at = await db_session.scalar(
+        select(Contact.updated_at).where(Contact.id == contact_id)
+    )
+    assert updated_at.year > 2000